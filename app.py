@@ -1,23 +1,25 @@
 import os
+import functools
+import hashlib
 import tempfile
 import fitz  # PyMuPDF
 from collections import defaultdict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, FrozenSet, Optional, Tuple
 import time
 
+import numpy as np
 import streamlit as st
-from PIL import Image, ImageDraw
+from PIL import Image
 from streamlit_drawable_canvas import st_canvas
 
-from redaction_logic import analyse_document_for_redactions
 from pdf_processor import PDFProcessor
-from utils import get_original_pdf_images
+from utils import render_pdf_page, Suggestion, PREVIEW_DPI
 
 # Measurement imports
 from measurement_processor import MeasurementProcessor, ScaleCalibration, Unit, MeasurementType
 from measurement_utils import (
     canvas_to_pdf_coords,
-    pdf_to_canvas_coords,
+    pdf_to_canvas_coords_batch,
     extract_canvas_objects_as_points,
     format_measurement_value,
     draw_measurement_on_image
@@ -33,8 +35,20 @@ st.set_page_config(
     }
 )
 
-PREVIEW_DPI = 150
 CANVAS_DISPLAY_WIDTH = 800
+CONTEXT_WINDOW_CHARS = 60
+
+# Keyed by MeasurementType value
+MEASUREMENT_COLORS = {
+    MeasurementType.DISTANCE.value: "red",
+    MeasurementType.PERIMETER.value: "blue",
+    MeasurementType.AREA.value: "green"
+}
+MEASUREMENT_ICONS = {
+    "distance": "📐",
+    "perimeter": "🔲",
+    "area": "⬛"
+}
 
 # ---------- CSS Styling ----------
 st.markdown("""
@@ -105,12 +119,19 @@ st.markdown("""
 def _init_state() -> None:
     ss = st.session_state
     ss.setdefault("processed_file", None)
-    ss.setdefault("original_pdf_images", [])
+    ss.setdefault("page_count", 0)
+    ss.setdefault("pdf_page_sizes", [])
     ss.setdefault("display_images", [])
     ss.setdefault("active_page_index", 0)
     ss.setdefault("suggestions", [])
+    ss.setdefault("suggestions_by_page", {})
+    ss.setdefault("suggestions_by_category", {})
+    ss.setdefault("category_list", ("All",))
+    ss.setdefault("suggestion_cb_keys", ())
     ss.setdefault("manual_rects", defaultdict(list))
+    ss.setdefault("canvas_scales", {})
     ss.setdefault("final_pdf_path", None)
+    ss.setdefault("final_pdf_bytes", None)
     ss.setdefault("last_promoted_ids", [])
     ss.setdefault("drawing_mode", "rect")
     ss.setdefault("user_context", "")
@@ -119,6 +140,7 @@ def _init_state() -> None:
     ss.setdefault("file_info", {})
     ss.setdefault("suggestion_filter", "")
     ss.setdefault("category_filter", "All")
+    ss.setdefault("review_table_version", 0)
     
     # Measurement state
     ss.setdefault("measurement_mode", False)
@@ -130,6 +152,8 @@ def _init_state() -> None:
 _init_state()
 
 # ---------- Helper Functions ----------
+# The directories don't move during the process lifetime, so create them once rather than per rerun
+@functools.lru_cache(maxsize=1)
 def _ensure_dirs() -> Dict[str, str]:
     base_tmp = tempfile.gettempdir()
     temp_dir = os.path.join(base_tmp, "redactor_tmp")
@@ -138,115 +162,215 @@ def _ensure_dirs() -> Dict[str, str]:
     os.makedirs(output_dir, exist_ok=True)
     return {"temp_dir": temp_dir, "output_dir": output_dir}
 
-def _save_upload_to_temp(upload, temp_dir: str) -> str:
+def _save_upload_to_temp(upload, temp_dir: str, file_digest: str) -> str:
+    """Save an upload under its content digest, skipping the write if that content is already on disk"""
     suffix = ".pdf"
-    safe_name = os.path.basename(upload.name).replace(os.sep, "_")
-    with tempfile.NamedTemporaryFile(prefix="upload_", suffix=suffix, dir=temp_dir, delete=False) as tf:
-        tf.write(upload.getbuffer())
-        saved_path = tf.name
+    saved_path = os.path.join(temp_dir, f"upload_{file_digest}{suffix}")
+    if not os.path.exists(saved_path):
+        # Write to a unique name and rename into place so a half-written file is never visible
+        with tempfile.NamedTemporaryFile(prefix="upload_", suffix=suffix, dir=temp_dir, delete=False) as tf:
+            tf.write(upload.getbuffer())
+        os.replace(tf.name, saved_path)
     return saved_path
 
-def _get_file_info(file_path: str) -> Dict:
-    """Get file information for display"""
+@st.cache_data(show_spinner=False, max_entries=16)
+def _get_file_info(file_path: str, mtime: float) -> Dict:
+    """Get file information for display (mtime invalidates the cache if the file changes); raises on an unreadable file"""
+    file_size = os.path.getsize(file_path)
+    doc = fitz.open(file_path)
     try:
-        file_size = os.path.getsize(file_path)
-        doc = fitz.open(file_path)
-        page_count = len(doc)
+        page_count = doc.page_count
+        # Read every page's size while the document is open, so later renders never reopen it
+        page_sizes = [(page.rect.width, page.rect.height) for page in doc]
+    finally:
         doc.close()
-        
-        return {
-            "size": f"{file_size / 1024 / 1024:.2f} MB",
-            "pages": page_count,
-            "name": os.path.basename(file_path)
-        }
-    except Exception as e:
-        return {"error": str(e)}
+    
+    return {
+        "size": f"{file_size / 1024 / 1024:.2f} MB",
+        "pages": page_count,
+        "page_sizes": page_sizes,
+        "name": os.path.basename(file_path)
+    }
+
+# The spinner only shows on a cache miss, i.e. the first time a page is opened
+@st.cache_data(show_spinner="🖼️ Rendering page...", max_entries=32)
+def _load_display_image(pdf_path: str, mtime: float, page_index: int) -> Image.Image:
+    """Rasterise a page straight at the canvas width the first time it is viewed (mtime invalidates the cache on re-upload)"""
+    return render_pdf_page(pdf_path, page_index, width=CANVAS_DISPLAY_WIDTH)
+
+def _display_image(page_index: int) -> Tuple[Image.Image, float]:
+    """The canvas-sized page and its PDF-point to canvas-pixel scale"""
+    pdf_path = st.session_state.processed_file
+    pdf_width = st.session_state.pdf_page_sizes[page_index][0]
+    return _load_display_image(pdf_path, os.path.getmtime(pdf_path), page_index), CANVAS_DISPLAY_WIDTH / pdf_width
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _analyse_cached(file_digest: str, user_context: str, _pdf_path: str) -> List[Dict]:
+    """Run the AI analysis once per (file content, instructions); failures raise, so only complete results are cached"""
+    # Deferred: redaction_logic pulls in the Azure and OpenAI SDKs, roughly half a second of
+    # cold start that the UI doesn't need until the first analysis
+    from redaction_logic import analyse_document_for_redactions
+    return analyse_document_for_redactions(_pdf_path, user_context)
 
 def _init_measurement_processor():
     """Initialize measurement processor if not already created"""
     if st.session_state.measurement_processor is None:
         st.session_state.measurement_processor = MeasurementProcessor()
 
-def _build_display_image(img: Image.Image, page_index: int) -> Image.Image:
-    w, h = img.size
-    scale = CANVAS_DISPLAY_WIDTH / float(w)
-    display_height = int(h * scale)
-    display_img = img.resize((CANVAS_DISPLAY_WIDTH, display_height))
-    
-    draw = ImageDraw.Draw(display_img)
+@st.cache_data(show_spinner=False, max_entries=64)
+def _render_page_preview(
+    _display_img: Image.Image,
+    pdf_to_display: float,
+    pdf_path: str,
+    page_index: int,
+    rects: Tuple[Tuple[float, float, float, float], ...]
+) -> Image.Image:
+    """Black out PDF-space rects on a canvas-sized page; (pdf_path, page_index) stands in for the unhashed image"""
+    # Scaled in one array op and rounded outwards so each box is fully covered
+    scaled = np.asarray(rects, dtype=np.float64) * pdf_to_display
+    boxes = np.hstack((np.floor(scaled[:, :2]), np.ceil(scaled[:, 2:]))).astype(np.int64)
+    np.maximum(boxes, 0, out=boxes)
+
+    pixels = np.array(_display_img)
+    for left, top, right, bottom in boxes.tolist():
+        pixels[top:bottom, left:right] = 0
+    return Image.fromarray(pixels)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _render_measurement_overlay(
+    _base: Image.Image,
+    pdf_path: str,
+    page_index: int,
+    page_size: Tuple[float, float],
+    measurements: Tuple[tuple, ...]
+) -> Image.Image:
+    """Draw a page's measurements over its preview; the page and measurement tuples are the cache key"""
+    display_img = _base
+    display_height = display_img.size[1]
+    pdf_width, pdf_height = page_size
     
-    # Draw redaction suggestions (only in redaction mode)
-    if not st.session_state.measurement_mode:
-        approved_suggestions = [
-            s for s in st.session_state.suggestions 
-            if st.session_state.get(f"cb_{s.get('id')}", True) and s.get('page_num') == page_index
+    # Draw each measurement
+    for measurement_type, unit, real_value, label, points in measurements:
+        points_canvas = [
+            tuple(point) for point in pdf_to_canvas_coords_batch(
+                points,
+                CANVAS_DISPLAY_WIDTH, display_height,
+                pdf_width, pdf_height
+            ).tolist()
         ]
         
-        dpi_to_display_scaling = (PREVIEW_DPI / 72.0) * scale
+        # Choose color based on measurement type
+        color = MEASUREMENT_COLORS.get(measurement_type, "red")
         
-        for suggestion in approved_suggestions:
-            for rect in suggestion.get('rects', []):
-                scaled_rect = (
-                    rect.x0 * dpi_to_display_scaling, 
-                    rect.y0 * dpi_to_display_scaling,
-                    rect.x1 * dpi_to_display_scaling, 
-                    rect.y1 * dpi_to_display_scaling
-                )
-                draw.rectangle(scaled_rect, fill="black")
+        # Format value text
+        value_text = format_measurement_value(
+            real_value,
+            unit,
+            measurement_type
+        )
+        
+        # Draw on image
+        display_img = draw_measurement_on_image(
+            display_img,
+            measurement_type,
+            points_canvas,
+            label,
+            value_text,
+            color,
+            line_width=2
+        )
     
+    return display_img
+
+def _build_display_image(page_index: int, approved_ids: FrozenSet[int]) -> Image.Image:
+    # Collect redaction suggestions (only in redaction mode)
+    approved_rects = ()
+    if not st.session_state.measurement_mode:
+        # Rect tuples were rounded at analysis time; dict.fromkeys drops repeats in first-seen order
+        approved_rects = tuple(dict.fromkeys(
+            rect
+            for s in st.session_state.suggestions_by_page.get(page_index, [])
+            if s.id in approved_ids
+            for rect in s.preview_rects
+        ))
+
+    # The canvas-sized page comes from the cache; MuPDF rasterised it at that width, so no resample
+    display_img, pdf_to_display = _display_image(page_index)
+    if approved_rects:
+        display_img = _render_page_preview(
+            display_img, pdf_to_display, st.session_state.processed_file, page_index, approved_rects
+        )
+
     # Draw measurements (only in measurement mode)
     if st.session_state.measurement_mode and st.session_state.measurement_processor:
         measurements = st.session_state.measurement_processor.get_measurements_for_page(page_index)
         
-        # Get PDF dimensions for coordinate conversion
-        if st.session_state.processed_file:
-            doc = fitz.open(st.session_state.processed_file)
-            page = doc[page_index]
-            pdf_width, pdf_height = page.rect.width, page.rect.height
-            doc.close()
-            
-            # Draw each measurement
-            for measurement in measurements:
-                points_canvas = []
-                for pdf_point in measurement.points:
-                    canvas_point = pdf_to_canvas_coords(
-                        pdf_point[0], pdf_point[1],
-                        CANVAS_DISPLAY_WIDTH, display_height,
-                        pdf_width, pdf_height,
-                        PREVIEW_DPI
-                    )
-                    points_canvas.append(canvas_point)
-                
-                # Choose color based on measurement type
-                color_map = {
-                    MeasurementType.DISTANCE: "red",
-                    MeasurementType.PERIMETER: "blue",
-                    MeasurementType.AREA: "green"
-                }
-                color = color_map.get(measurement.measurement_type, "red")
-                
-                # Format value text
-                value_text = format_measurement_value(
-                    measurement.real_value,
-                    measurement.unit.value,
-                    measurement.measurement_type.value
-                )
-                
-                # Draw on image
-                display_img = draw_measurement_on_image(
-                    display_img,
-                    measurement.measurement_type.value,
-                    points_canvas,
-                    measurement.label,
-                    value_text,
-                    color,
-                    line_width=2
-                )
+        # PDF dimensions for coordinate conversion
+        if measurements and st.session_state.pdf_page_sizes:
+            measurement_key = tuple(
+                (m.measurement_type.value, m.unit.value, m.real_value, m.label, tuple(map(tuple, m.points)))
+                for m in measurements
+            )
+            display_img = _render_measurement_overlay(
+                display_img,
+                st.session_state.processed_file,
+                page_index,
+                st.session_state.pdf_page_sizes[page_index],
+                measurement_key
+            )
     
     return display_img
 
+# ---------- Button callbacks ----------
+# These run before the rerun the click already triggers, so the state change is
+# visible to the whole script without a second st.rerun() pass
+CALIBRATION_UNITS = {
+    "inches": Unit.INCHES,
+    "cm": Unit.CENTIMETERS,
+    "mm": Unit.MILLIMETERS,
+    "feet": Unit.FEET,
+    "meters": Unit.METERS
+}
+
+def _set_measurement_mode(enabled: bool) -> None:
+    st.session_state.measurement_mode = enabled
+    if enabled:
+        _init_measurement_processor()
+
+def _reset_session() -> None:
+    keys_to_delete = [k for k in st.session_state.keys() 
+                     if k in ["processed_file", "page_count", "pdf_page_sizes", "display_images", 
+                            "active_page_index", "suggestions", "suggestions_by_page",
+                            "suggestions_by_category", "category_list", "suggestion_cb_keys", "manual_rects", "canvas_scales",
+                            "final_pdf_path", "final_pdf_bytes", "last_promoted_ids", "analysis_timestamp",
+                            "processing_time", "file_info", "measurement_processor",
+                            "pending_measurement_objects"] or k.startswith("cb_")]
+    
+    for k in keys_to_delete:
+        if k in st.session_state:
+            del st.session_state[k]
+    _init_state()
+
+def _apply_calibration(all_pages: bool) -> None:
+    ss = st.session_state
+    unit_enum = CALIBRATION_UNITS.get(ss.cal_unit, Unit.INCHES)
+    new_cal = ScaleCalibration(ss.cal_pdf_distance, ss.cal_real_distance, unit_enum)
+    if all_pages:
+        ss.measurement_processor.apply_calibration_to_all_pages(new_cal, _page_count())
+        st.toast(f"✅ Applied to all {_page_count()} pages")
+    else:
+        ss.measurement_processor.set_calibration(ss.active_page_index, new_cal)
+        st.toast(f"✅ Applied to page {ss.active_page_index + 1}")
+
+def _delete_measurement(measurement) -> None:
+    st.session_state.measurement_processor.measurements.remove(measurement)
+
+def _clear_measurements() -> None:
+    st.session_state.measurement_processor.clear_measurements()
+    st.toast("Cleared all measurements")
+
 def _page_count() -> int:
-    return len(st.session_state.original_pdf_images)
+    return st.session_state.page_count
 
 def _goto_page(i: int) -> None:
     total = _page_count()
@@ -255,19 +379,59 @@ def _goto_page(i: int) -> None:
         return
     st.session_state.active_page_index = max(0, min(total - 1, i))
 
-def _get_suggestion_stats() -> Dict:
+def _goto_typed_page() -> None:
+    _goto_page(st.session_state.page_number_input - 1)
+
+def _index_suggestions(suggestions: List[Suggestion]) -> None:
+    """Group suggestions by page and by category once per analysis, so reruns don't rescan the full list"""
+    by_page = defaultdict(list)
+    by_category = defaultdict(list)
+    for s in suggestions:
+        # Approval widget key and table snippet
+        s.cb_key = f"cb_{s.id}"
+        s.snippet = f"{s.text[:50]}..." if len(s.text) > 50 else s.text
+        # Rounded to 0.1pt (well under a preview pixel) so repeated hits on the same
+        # text collapse into one box; plain tuples so previews skip the fitz.Rect attribute reads
+        s.preview_rects = tuple(
+            (round(rect.x0, 1), round(rect.y0, 1), round(rect.x1, 1), round(rect.y1, 1)) for rect in s.rects
+        )
+        by_page[s.page_num].append(s)
+        by_category[s.category].append(s)
+    st.session_state.suggestions_by_page = dict(by_page)
+    st.session_state.suggestions_by_category = dict(by_category)
+    st.session_state.category_list = ("All",) + tuple(sorted(by_category))
+    st.session_state.suggestion_cb_keys = tuple(s.cb_key for s in suggestions)
+
+def _approved_ids() -> FrozenSet[int]:
+    """Ids of every suggestion ticked for redaction, read once per rerun for cheap membership tests"""
+    ss = st.session_state
+    return frozenset(s.id for s in ss.suggestions if ss.get(s.cb_key, True))
+
+def _clear_export() -> bool:
+    """Drop the last export once the redactions it was built from change; True if there was one"""
+    ss = st.session_state
+    had_export = ss.final_pdf_bytes is not None
+    ss.final_pdf_path = None
+    ss.final_pdf_bytes = None
+    return had_export
+
+def _clear_approvals() -> None:
+    """Forget every cb_ approval from a previous analysis; unticked ids would otherwise carry over"""
+    ss = st.session_state
+    for key in [k for k in ss if k.startswith("cb_")]:
+        del ss[key]
+    # Any review-table state belongs to the old suggestion list as well
+    ss.review_table_version += 1
+
+def _get_suggestion_stats(approved_ids: FrozenSet[int]) -> Dict:
     """Calculate statistics about suggestions"""
     if not st.session_state.suggestions:
         return {}
     
     total = len(st.session_state.suggestions)
-    approved = sum(1 for s in st.session_state.suggestions 
-                  if st.session_state.get(f"cb_{s.get('id')}", True))
-    
-    categories = {}
-    for s in st.session_state.suggestions:
-        cat = s.get('category', 'Unknown')
-        categories[cat] = categories.get(cat, 0) + 1
+    # Category counts come from the index, so only approvals need counting here
+    approved = len(approved_ids)
+    categories = {cat: len(items) for cat, items in st.session_state.suggestions_by_category.items()}
     
     return {
         "total": total,
@@ -276,24 +440,215 @@ def _get_suggestion_stats() -> Dict:
         "categories": categories
     }
 
-def _filter_suggestions(suggestions: List[Dict]) -> List[Dict]:
+def _set_all_approvals(approved: bool) -> None:
+    """Tick or untick every suggestion in one session_state update"""
+    st.session_state.update(dict.fromkeys(st.session_state.suggestion_cb_keys, approved))
+    _clear_export()
+    # Any unsubmitted table edits would otherwise override the bulk choice
+    st.session_state.review_table_version += 1
+
+def _context_window(suggestion: Suggestion) -> Optional[str]:
+    """Surrounding context for a suggestion, sliced from its precomputed match offsets"""
+    context = suggestion.context
+    start, end = suggestion.match_start, suggestion.match_end
+    if not context or start is None or end is None:
+        return None
+    before = context[max(0, start - CONTEXT_WINDOW_CHARS):start]
+    after = context[end:end + CONTEXT_WINDOW_CHARS]
+    return f"…{before}«{context[start:end]}»{after}…"
+
+def _apply_review_edits(editor_key: str, suggestion_ids: Tuple[int, ...]) -> None:
+    """Form-submit callback: copy the review table's edited Redact cells into the cb_ keys"""
+    edited_rows = st.session_state.get(editor_key, {}).get("edited_rows", {})
+    for row, changes in edited_rows.items():
+        if "redact" in changes:
+            st.session_state[f"cb_{suggestion_ids[int(row)]}"] = bool(changes["redact"])
+    if edited_rows:
+        _clear_export()
+    # The edits now live in the cb_ keys; a fresh table key drops the stale diff
+    st.session_state.review_table_version += 1
+
+def _filter_suggestions(suggestions: List[Suggestion]) -> List[Suggestion]:
     """Filter suggestions based on current filters"""
     filtered = suggestions
     
+    # Category filter, straight from the index, so the text filter only scans that category
+    if st.session_state.category_filter != "All":
+        filtered = st.session_state.suggestions_by_category.get(st.session_state.category_filter, [])
+    
     # Text filter
     if st.session_state.suggestion_filter:
         filter_text = st.session_state.suggestion_filter.lower()
-        filtered = [s for s in filtered if filter_text in s.get('text', '').lower() 
-                   or filter_text in s.get('category', '').lower()]
-    
-    # Category filter
-    if st.session_state.category_filter != "All":
-        filtered = [s for s in filtered if s.get('category') == st.session_state.category_filter]
+        filtered = [s for s in filtered if filter_text in s.text.lower() 
+                   or filter_text in s.category.lower()]
     
     return filtered
 
+@st.fragment
+def _render_suggestions_panel() -> None:
+    """Filters, bulk actions and the review table; a fragment, so filtering doesn't rebuild the canvas"""
+    approved_ids = _approved_ids()
+
+    st.header("🎯 AI Suggestions")
+
+    filter_col1, filter_col2 = st.columns([2, 1])
+    with filter_col1:
+        st.session_state.suggestion_filter = st.text_input(
+            "🔍 Search suggestions", 
+            value=st.session_state.suggestion_filter,
+            placeholder="Filter by text or category..."
+        )
+
+    with filter_col2:
+        categories = st.session_state.category_list
+        st.session_state.category_filter = st.selectbox(
+            "Category", 
+            categories,
+            index=categories.index(st.session_state.category_filter) 
+                  if st.session_state.category_filter in categories else 0
+        )
+
+    bulk_col1, bulk_col2 = st.columns(2)
+    with bulk_col1:
+        if st.button("✅ Approve All", use_container_width=True):
+            _set_all_approvals(True)
+            st.rerun()
+    with bulk_col2:
+        if st.button("❌ Reject All", use_container_width=True):
+            _set_all_approvals(False)
+            st.rerun()
+
+    if st.session_state.suggestions:
+        filtered_suggestions = _filter_suggestions(st.session_state.suggestions)
+
+        if not filtered_suggestions:
+            st.warning("No suggestions match the current filters.")
+        else:
+            # One editable table in a form; the edits land in the cb_ keys on submit
+            review_ids = []
+            review_rows = {"redact": [], "page": [], "category": [], "text": [], "context": []}
+            ordered_suggestions = sorted(filtered_suggestions, key=lambda s: s.page_num)
+            for suggestion in ordered_suggestions:
+                suggestion_id = suggestion.id
+                category = suggestion.category
+                page_num = suggestion.page_num
+
+                review_ids.append(suggestion_id)
+                review_rows["redact"].append(suggestion_id in approved_ids)
+                review_rows["page"].append(page_num + 1)
+                review_rows["category"].append(category)
+                review_rows["text"].append(suggestion.snippet)
+                review_rows["context"].append(_context_window(suggestion))
+
+            editor_key = f"review_table_{st.session_state.review_table_version}"
+            with st.form("suggestion_review", border=False):
+                st.data_editor(
+                    # A dict of columns; Streamlit builds the frame itself
+                    review_rows,
+                    key=editor_key,
+                    hide_index=True,
+                    use_container_width=True,
+                    disabled=["page", "category", "text", "context"],
+                    column_config={
+                        "redact": st.column_config.CheckboxColumn("Redact", width="small"),
+                        "page": st.column_config.NumberColumn("Page", width="small"),
+                        "category": st.column_config.TextColumn("Category"),
+                        "text": st.column_config.TextColumn("Text"),
+                        "context": st.column_config.TextColumn("Context"),
+                    }
+                )
+
+                if st.form_submit_button(
+                    "🔄 Update Preview",
+                    type="primary",
+                    use_container_width=True,
+                    on_click=_apply_review_edits,
+                    args=(editor_key, tuple(review_ids))
+                ):
+                    # A submit only reruns this fragment; the preview and stats need the full app
+                    st.rerun(scope="app")
+
+            # One click to a row's page, without reading the number off the table
+            goto_col1, goto_col2 = st.columns([3, 1])
+            with goto_col1:
+                target = st.selectbox(
+                    "Jump to suggestion",
+                    ordered_suggestions,
+                    format_func=lambda s: f"Pg {s.page_num + 1}: {s.snippet}",
+                    label_visibility="collapsed"
+                )
+            with goto_col2:
+                if st.button("👁️ Go to page", use_container_width=True,
+                             on_click=_goto_page, args=(target.page_num,)):
+                    # The preview lives outside this fragment
+                    st.rerun(scope="app")
+    else:
+        st.info("🔍 No AI suggestions found for this document.")
+
+def _box_geometry(objs: List[Dict]) -> List[Tuple]:
+    return [(o.get("type"), o.get("left"), o.get("top"), o.get("width"), o.get("height")) for o in objs]
+
+@st.fragment
+def _render_redaction_canvas(page_index: int, approved_ids: FrozenSet[int]) -> None:
+    """Mode switch and drawable redaction canvas for one page; a fragment, so drawing reruns only the canvas"""
+    st.subheader("🎨 Canvas Mode")
+    mode = st.radio(
+        "",
+        ["✏️ Draw new redactions", "✂️ Edit/Delete existing"],
+        horizontal=True,
+        index=0 if st.session_state.drawing_mode == "rect" else 1,
+        key="canvas_mode",
+    )
+    st.session_state.drawing_mode = "rect" if mode.startswith("✏️") else "transform"
+
+    base_display = _build_display_image(page_index, approved_ids)
+    display_height = base_display.size[1]
+    # Canvas pixel to PDF point factors for this page, kept for the export so it
+    # never has to fetch the page image again just to read its size
+    pdf_w, pdf_h = st.session_state.pdf_page_sizes[page_index]
+    st.session_state.canvas_scales[page_index] = (
+        pdf_w / CANVAS_DISPLAY_WIDTH, pdf_h / display_height
+    )
+
+    if st.session_state.drawing_mode == "rect":
+        st.info("💡 **Draw mode**: Click and drag to add black redaction boxes.")
+    else:
+        manual_boxes = st.session_state.manual_rects.get(page_index, [])
+        if not manual_boxes:
+            st.warning("⚠️ **Edit mode**: No manual boxes on this page.")
+        else:
+            st.info(f"💡 **Edit mode**: {len(manual_boxes)} manual boxes on this page.")
+
+    canvas_result = st_canvas(
+        fill_color="rgba(0, 0, 0, 1.0)",
+        stroke_width=0,
+        background_image=base_display,
+        update_streamlit=True,
+        height=display_height,
+        width=CANVAS_DISPLAY_WIDTH,
+        drawing_mode=st.session_state.drawing_mode,
+        initial_drawing={"objects": st.session_state.manual_rects.get(page_index, [])},
+        display_toolbar=True,
+        key=f"canvas_{page_index}_{st.session_state.analysis_timestamp}",
+    )
+
+    if canvas_result.json_data is not None:
+        new_objs = canvas_result.json_data.get("objects", [])
+        old_objs = st.session_state.manual_rects.get(page_index, [])
+        st.session_state.manual_rects[page_index] = new_objs
+        # Compared on the fields the export reads, so a remount's re-serialised objects don't count
+        if _box_geometry(new_objs) != _box_geometry(old_objs):
+            had_export = _clear_export()
+            if had_export or len(new_objs) != len(old_objs):
+                # The export summary counts manual boxes, and a stale download must go
+                st.rerun(scope="app")
+
 # ---------- Main UI ----------
 def main():
+    approved_ids = _approved_ids()
+    # Used by both the sidebar stats and the export summary
+    stats = _get_suggestion_stats(approved_ids)
+
     # ---- Header ----
     st.markdown("""
     <div class="main-header">
@@ -326,19 +681,16 @@ def main():
             
             col1, col2 = st.columns(2)
             with col1:
-                if st.button("🖍️ Redact", 
-                            type="primary" if not st.session_state.measurement_mode else "secondary",
-                            use_container_width=True):
-                    st.session_state.measurement_mode = False
-                    st.rerun()
+                st.button("🖍️ Redact", 
+                          type="primary" if not st.session_state.measurement_mode else "secondary",
+                          use_container_width=True,
+                          on_click=_set_measurement_mode, args=(False,))
             
             with col2:
-                if st.button("📏 Measure",
-                            type="primary" if st.session_state.measurement_mode else "secondary",
-                            use_container_width=True):
-                    st.session_state.measurement_mode = True
-                    _init_measurement_processor()
-                    st.rerun()
+                st.button("📏 Measure",
+                          type="primary" if st.session_state.measurement_mode else "secondary",
+                          use_container_width=True,
+                          on_click=_set_measurement_mode, args=(True,))
             
             st.caption(f"**Active:** {current_mode}")
             st.divider()
@@ -371,7 +723,6 @@ def main():
         
         elif st.session_state.suggestions:
             st.header("📊 Redaction Stats")
-            stats = _get_suggestion_stats()
             
             col1, col2 = st.columns(2)
             with col1:
@@ -408,7 +759,8 @@ def main():
             st.markdown("""
             **Redaction Mode:**
             - Use arrow buttons to navigate pages
-            - Click suggestions to jump to location
+            - Tick/untick suggestions, then **Update Preview**
+            - Pick a suggestion and click 👁️ to jump to its page
             - Draw manual boxes on canvas
             - Review all before exporting
             
@@ -456,26 +808,11 @@ def main():
             disabled=uploaded_file is None or st.session_state.measurement_mode
         )
     with col2:
-        reset_clicked = st.button("🔄 Reset", use_container_width=True)
+        st.button("🔄 Reset", use_container_width=True, on_click=_reset_session)
     with col3:
         if st.session_state.suggestions and not st.session_state.measurement_mode:
-            if st.button("💾 Quick Export", use_container_width=True):
-                st.rerun()
-
-    # Reset handling
-    if reset_clicked:
-        keys_to_delete = [k for k in st.session_state.keys() 
-                         if k in ["processed_file", "original_pdf_images", "display_images", 
-                                "active_page_index", "suggestions", "manual_rects", 
-                                "final_pdf_path", "last_promoted_ids", "analysis_timestamp",
-                                "processing_time", "file_info", "measurement_processor",
-                                "pending_measurement_objects"] or k.startswith("cb_")]
-        
-        for k in keys_to_delete:
-            if k in st.session_state:
-                del st.session_state[k]
-        _init_state()
-        st.rerun()
+            # Does nothing but trigger a rerun
+            st.button("💾 Quick Export", use_container_width=True)
 
     # Analysis handling
     if uploaded_file is not None and analyse_clicked:
@@ -488,31 +825,53 @@ def main():
             
             status_text.text("📁 Saving uploaded file...")
             progress_bar.progress(10)
-            input_pdf_path = _save_upload_to_temp(uploaded_file, paths["temp_dir"])
+            file_digest = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+            input_pdf_path = _save_upload_to_temp(uploaded_file, paths["temp_dir"], file_digest)
             
-            st.session_state.file_info = _get_file_info(input_pdf_path)
+            try:
+                st.session_state.file_info = _get_file_info(input_pdf_path, os.path.getmtime(input_pdf_path))
+            except Exception as e:
+                st.session_state.file_info = {"error": str(e)}
             
             st.session_state.processed_file = input_pdf_path
             st.session_state.final_pdf_path = None
+            st.session_state.final_pdf_bytes = None
             st.session_state.suggestions = []
             st.session_state.manual_rects = defaultdict(list)
+            st.session_state.canvas_scales = {}
             st.session_state.active_page_index = 0
             st.session_state.drawing_mode = "rect"
             st.session_state.analysis_timestamp = time.time()
 
             status_text.text("🖼️ Rendering document preview...")
             progress_bar.progress(30)
-            orig_images: List[Image.Image] = get_original_pdf_images(input_pdf_path)
-            st.session_state.original_pdf_images = orig_images
+            # Pages are rendered as they are viewed; only the first is needed up front
+            st.session_state.page_count = st.session_state.file_info.get("pages", 0)
+            st.session_state.pdf_page_sizes = st.session_state.file_info.get("page_sizes", [])
+            if st.session_state.page_count:
+                try:
+                    _display_image(0)
+                except Exception:
+                    # Not cached; the preview retries the page and reports the error
+                    pass
 
             status_text.text("🤖 Analyzing document with AI...")
             progress_bar.progress(50)
-            suggestions = analyse_document_for_redactions(input_pdf_path, st.session_state.user_context)
-            st.session_state.suggestions = suggestions or []
+            try:
+                suggestions = _analyse_cached(file_digest, st.session_state.user_context, input_pdf_path)
+            except Exception as e:
+                # Nothing was cached, so clicking Analyze again retries the failed calls
+                progress_bar.empty()
+                status_text.empty()
+                st.session_state.processed_file = None
+                st.session_state.page_count = 0
+                st.error(f"❌ Analysis failed, please try again: {e}")
+                st.stop()
+            # Suggestion objects for the session
+            st.session_state.suggestions = [Suggestion.from_dict(s) for s in suggestions or []]
+            _index_suggestions(st.session_state.suggestions)
             
-            for key in list(st.session_state.keys()):
-                if key.startswith("cb_"):
-                    del st.session_state[key]
+            _clear_approvals()
             
             status_text.text("✅ Analysis complete!")
             progress_bar.progress(100)
@@ -541,16 +900,11 @@ def main():
                 
                 # Measurement type selection
                 st.subheader("🎯 Measurement Type")
-                measurement_icons = {
-                    "distance": "📐",
-                    "perimeter": "🔲",
-                    "area": "⬛"
-                }
                 
                 selected_type = st.radio(
                     "Select type:",
                     ["distance", "perimeter", "area"],
-                    format_func=lambda x: f"{measurement_icons[x]} {x.title()}",
+                    format_func=lambda x: f"{MEASUREMENT_ICONS[x]} {x.title()}",
                     horizontal=True,
                     key="measurement_type_selector"
                 )
@@ -588,7 +942,8 @@ def main():
                             min_value=0.1,
                             value=float(current_cal.pdf_distance),
                             step=1.0,
-                            help="72 points = 1 inch"
+                            help="72 points = 1 inch",
+                            key="cal_pdf_distance"
                         )
                     
                     with col_real:
@@ -596,7 +951,8 @@ def main():
                             "Real Distance",
                             min_value=0.001,
                             value=float(current_cal.real_distance),
-                            step=0.1
+                            step=0.1,
+                            key="cal_real_distance"
                         )
                     
                     unit_options = ["inches", "cm", "mm", "feet", "meters"]
@@ -607,7 +963,8 @@ def main():
                     unit_select = st.selectbox(
                         "Unit",
                         unit_options,
-                        index=unit_options.index(current_unit_name)
+                        index=unit_options.index(current_unit_name),
+                        key="cal_unit"
                     )
                     
                     st.caption(f"**Scale:** 1 pt = {real_dist/pdf_dist:.6f} {unit_select}")
@@ -615,38 +972,12 @@ def main():
                     apply_col1, apply_col2 = st.columns(2)
                     
                     with apply_col1:
-                        if st.button("✅ Apply to Page", use_container_width=True):
-                            unit_map = {
-                                "inches": Unit.INCHES,
-                                "cm": Unit.CENTIMETERS,
-                                "mm": Unit.MILLIMETERS,
-                                "feet": Unit.FEET,
-                                "meters": Unit.METERS
-                            }
-                            unit_enum = unit_map.get(unit_select, Unit.INCHES)
-                            new_cal = ScaleCalibration(pdf_dist, real_dist, unit_enum)
-                            st.session_state.measurement_processor.set_calibration(
-                                st.session_state.active_page_index, new_cal
-                            )
-                            st.success(f"✅ Applied to page {st.session_state.active_page_index + 1}")
-                            st.rerun()
+                        st.button("✅ Apply to Page", use_container_width=True,
+                                  on_click=_apply_calibration, args=(False,))
                     
                     with apply_col2:
-                        if st.button("✅ Apply to All", use_container_width=True):
-                            unit_map = {
-                                "inches": Unit.INCHES,
-                                "cm": Unit.CENTIMETERS,
-                                "mm": Unit.MILLIMETERS,
-                                "feet": Unit.FEET,
-                                "meters": Unit.METERS
-                            }
-                            unit_enum = unit_map.get(unit_select, Unit.INCHES)
-                            new_cal = ScaleCalibration(pdf_dist, real_dist, unit_enum)
-                            st.session_state.measurement_processor.apply_calibration_to_all_pages(
-                                new_cal, _page_count()
-                            )
-                            st.success(f"✅ Applied to all {_page_count()} pages")
-                            st.rerun()
+                        st.button("✅ Apply to All", use_container_width=True,
+                                  on_click=_apply_calibration, args=(True,))
                 
                 st.divider()
                 
@@ -660,7 +991,7 @@ def main():
                 if page_measurements:
                     for i, measurement in enumerate(page_measurements):
                         with st.container():
-                            mtype_icon = measurement_icons.get(measurement.measurement_type.value, "📏")
+                            mtype_icon = MEASUREMENT_ICONS.get(measurement.measurement_type.value, "📏")
                             
                             col_info, col_value, col_delete = st.columns([3, 2, 1])
                             
@@ -677,9 +1008,8 @@ def main():
                                 st.caption(f"{measurement.value:.1f} pts")
                             
                             with col_delete:
-                                if st.button("🗑️", key=f"del_m_{i}_{st.session_state.active_page_index}"):
-                                    st.session_state.measurement_processor.measurements.remove(measurement)
-                                    st.rerun()
+                                st.button("🗑️", key=f"del_m_{i}_{st.session_state.active_page_index}",
+                                          on_click=_delete_measurement, args=(measurement,))
                             
                             st.divider()
                 else:
@@ -712,88 +1042,10 @@ def main():
                             use_container_width=True
                         )
                     
-                    if st.button("🗑️ Clear All", use_container_width=True):
-                        st.session_state.measurement_processor.clear_measurements()
-                        st.success("Cleared all measurements")
-                        st.rerun()
+                    st.button("🗑️ Clear All", use_container_width=True, on_click=_clear_measurements)
             
             else:
-                # REDACTION SUGGESTIONS PANEL
-                st.header("🎯 AI Suggestions")
-                
-                filter_col1, filter_col2 = st.columns([2, 1])
-                with filter_col1:
-                    st.session_state.suggestion_filter = st.text_input(
-                        "🔍 Search suggestions", 
-                        value=st.session_state.suggestion_filter,
-                        placeholder="Filter by text or category..."
-                    )
-                
-                with filter_col2:
-                    categories = ["All"] + sorted(list(set(s.get('category', 'Unknown') 
-                                                        for s in st.session_state.suggestions)))
-                    st.session_state.category_filter = st.selectbox(
-                        "Category", 
-                        categories,
-                        index=categories.index(st.session_state.category_filter) 
-                              if st.session_state.category_filter in categories else 0
-                    )
-                
-                bulk_col1, bulk_col2 = st.columns(2)
-                with bulk_col1:
-                    if st.button("✅ Approve All", use_container_width=True):
-                        for suggestion in st.session_state.suggestions:
-                            st.session_state[f"cb_{suggestion.get('id')}"] = True
-                        st.rerun()
-                with bulk_col2:
-                    if st.button("❌ Reject All", use_container_width=True):
-                        for suggestion in st.session_state.suggestions:
-                            st.session_state[f"cb_{suggestion.get('id')}"] = False
-                        st.rerun()
-                
-                if st.session_state.suggestions:
-                    filtered_suggestions = _filter_suggestions(st.session_state.suggestions)
-                    
-                    if not filtered_suggestions:
-                        st.warning("No suggestions match the current filters.")
-                    else:
-                        doc = fitz.open(st.session_state.processed_file)
-                        try:
-                            for suggestion in filtered_suggestions:
-                                suggestion_id = suggestion.get('id')
-                                category = suggestion.get('category', 'Unknown')
-                                text = suggestion.get('text', 'No text')
-                                page_num = suggestion.get('page_num', 0)
-                                
-                                try:
-                                    context_snippet = f"Pg {page_num + 1}: {text}"
-                                    if len(text) > 50:
-                                        context_snippet = f"Pg {page_num + 1}: {text[:50]}..."
-                                except:
-                                    context_snippet = f"Pg {page_num + 1}: {text}"
-                                
-                                checkbox_key = f"cb_{suggestion_id}"
-                                if checkbox_key not in st.session_state:
-                                    st.session_state[checkbox_key] = True
-                                
-                                with st.container():
-                                    col_check, col_goto = st.columns([4, 1])
-                                    
-                                    with col_check:
-                                        st.checkbox(
-                                            f"**{category}**: {context_snippet}",
-                                            key=checkbox_key
-                                        )
-                                    
-                                    with col_goto:
-                                        if st.button("👁️", key=f"goto_{suggestion_id}", 
-                                                   help="Jump to suggestion"):
-                                            _goto_page(page_num)
-                                            st.rerun()
-                        finally:
-                            doc.close()
-                else:
-                    st.info("🔍 No AI suggestions found for this document.")
+                _render_suggestions_panel()
         
         # RIGHT COLUMN - Canvas/Preview
         with col2:
@@ -805,42 +1057,48 @@ def main():
             # Navigation
             nav_col1, nav_col2, nav_col3, nav_col4, nav_col5, nav_col6 = st.columns([0.15, 0.15, 0.3, 0.2, 0.15, 0.15])
             
+            # Each control moves the page in its callback, so a click costs one script run
             with nav_col1:
-                if st.button("⏮️", use_container_width=True, disabled=(page_index == 0)):
-                    _goto_page(0)
-                    st.rerun()
+                st.button("⏮️", use_container_width=True, disabled=(page_index == 0),
+                          on_click=_goto_page, args=(0,))
             
             with nav_col2:
-                if st.button("◀️", use_container_width=True, disabled=(page_index == 0)):
-                    _goto_page(page_index - 1)
-                    st.rerun()
+                st.button("◀️", use_container_width=True, disabled=(page_index == 0),
+                          on_click=_goto_page, args=(page_index - 1,))
             
             with nav_col3:
-                new_page = st.number_input(
+                # Follow the buttons; safe to set because the widget isn't created yet this run
+                st.session_state.page_number_input = page_index + 1
+                st.number_input(
                     "Page", 
                     min_value=1, 
                     max_value=total_pages, 
-                    value=page_index + 1
+                    key="page_number_input",
+                    on_change=_goto_typed_page
                 )
-                if new_page - 1 != page_index:
-                    _goto_page(new_page - 1)
-                    st.rerun()
             
             with nav_col4:
                 st.markdown(f"**of {total_pages}**")
             
             with nav_col5:
-                if st.button("▶️", use_container_width=True, disabled=(page_index >= total_pages - 1)):
-                    _goto_page(page_index + 1)
-                    st.rerun()
+                st.button("▶️", use_container_width=True, disabled=(page_index >= total_pages - 1),
+                          on_click=_goto_page, args=(page_index + 1,))
             
             with nav_col6:
-                if st.button("⏭️", use_container_width=True, disabled=(page_index >= total_pages - 1)):
-                    _goto_page(total_pages - 1)
-                    st.rerun()
+                st.button("⏭️", use_container_width=True, disabled=(page_index >= total_pages - 1),
+                          on_click=_goto_page, args=(total_pages - 1,))
+
+            # A page that can't be rendered shows an error instead of a canvas
+            try:
+                _display_image(page_index)
+                page_error = None
+            except Exception as e:
+                page_error = e
 
             # Canvas based on mode
-            if st.session_state.measurement_mode:
+            if page_error is not None:
+                st.error(f"❌ Could not render page {page_index + 1}: {page_error}")
+            elif st.session_state.measurement_mode:
                 # MEASUREMENT CANVAS
                 st.subheader("📏 Measurement Canvas")
                 
@@ -851,10 +1109,7 @@ def main():
                     canvas_drawing_mode = "polygon"
                     stroke_color = "#0000FF" if st.session_state.measurement_type == "perimeter" else "#00FF00"
                 
-                base_display = _build_display_image(
-                    st.session_state.original_pdf_images[page_index], 
-                    page_index
-                )
+                base_display = _build_display_image(page_index, approved_ids)
                 display_height = base_display.size[1]
                 
                 canvas_result = st_canvas(
@@ -876,10 +1131,7 @@ def main():
                     
                     if objects:
                         if st.button("✅ Finalize Measurement", type="primary"):
-                            doc = fitz.open(st.session_state.processed_file)
-                            page = doc[page_index]
-                            pdf_width, pdf_height = page.rect.width, page.rect.height
-                            doc.close()
+                            pdf_width, pdf_height = st.session_state.pdf_page_sizes[page_index]
                             
                             points = extract_canvas_objects_as_points(
                                 objects, CANVAS_DISPLAY_WIDTH, display_height,
@@ -928,49 +1180,7 @@ def main():
                                     st.error(f"❌ Error: {str(e)}")
             
             else:
-                # REDACTION CANVAS
-                st.subheader("🎨 Canvas Mode")
-                mode = st.radio(
-                    "",
-                    ["✏️ Draw new redactions", "✂️ Edit/Delete existing"],
-                    horizontal=True,
-                    index=0 if st.session_state.drawing_mode == "rect" else 1,
-                    key="canvas_mode",
-                )
-                st.session_state.drawing_mode = "rect" if mode.startswith("✏️") else "transform"
-
-                base_display = _build_display_image(
-                    st.session_state.original_pdf_images[page_index], 
-                    page_index
-                )
-                display_height = base_display.size[1]
-
-                if st.session_state.drawing_mode == "rect":
-                    st.info("💡 **Draw mode**: Click and drag to add black redaction boxes.")
-                else:
-                    manual_boxes = st.session_state.manual_rects.get(page_index, [])
-                    if not manual_boxes:
-                        st.warning("⚠️ **Edit mode**: No manual boxes on this page.")
-                    else:
-                        st.info(f"💡 **Edit mode**: {len(manual_boxes)} manual boxes on this page.")
-
-                canvas_result = st_canvas(
-                    fill_color="rgba(0, 0, 0, 1.0)",
-                    stroke_width=0,
-                    background_image=base_display,
-                    update_streamlit=True,
-                    height=display_height,
-                    width=CANVAS_DISPLAY_WIDTH,
-                    drawing_mode=st.session_state.drawing_mode,
-                    initial_drawing={"objects": st.session_state.manual_rects.get(page_index, [])},
-                    display_toolbar=True,
-                    key=f"canvas_{page_index}_{st.session_state.analysis_timestamp}",
-                )
-
-                if canvas_result.json_data is not None:
-                    new_objs = canvas_result.json_data.get("objects", [])
-                    if new_objs != st.session_state.manual_rects.get(page_index, []):
-                        st.session_state.manual_rects[page_index] = new_objs
+                _render_redaction_canvas(page_index, approved_ids)
 
         # Export section (redaction mode only)
         if not st.session_state.measurement_mode:
@@ -978,14 +1188,13 @@ def main():
             st.header("📤 Export Redacted Document")
             
             if st.session_state.suggestions:
-                stats = _get_suggestion_stats()
-                total_redactions = stats['approved'] + sum(len(objs) for objs in st.session_state.manual_rects.values())
+                manual_count = sum(len(objs) for objs in st.session_state.manual_rects.values())
+                total_redactions = stats['approved'] + manual_count
                 
                 summary_col1, summary_col2, summary_col3 = st.columns(3)
                 with summary_col1:
                     st.metric("AI Redactions", stats['approved'])
                 with summary_col2:
-                    manual_count = sum(len(objs) for objs in st.session_state.manual_rects.values())
                     st.metric("Manual Redactions", manual_count)
                 with summary_col3:
                     st.metric("Total Redactions", total_redactions)
@@ -1000,7 +1209,8 @@ def main():
                 )
             
             with export_col2:
-                if st.session_state.final_pdf_path:
+                # On a click the outcome is reported below instead
+                if st.session_state.final_pdf_path and not export_clicked:
                     st.markdown(f"""
                     <div class="success-box">
                         ✅ <strong>Export Complete!</strong><br>
@@ -1008,70 +1218,74 @@ def main():
                     </div>
                     """, unsafe_allow_html=True)
 
-            if export_clicked:
+            if export_clicked and not approved_ids and not any(st.session_state.manual_rects.values()):
+                # Nothing ticked and nothing drawn: say so before walking any suggestion or box
+                st.error("❌ No redactions to apply.")
+            elif export_clicked:
+                # A failed export must not leave the previous file on offer
+                _clear_export()
                 with st.spinner("🔄 Applying redactions..."):
                     all_redactions = defaultdict(list)
                     
                     # Add approved AI suggestions
-                    for suggestion in st.session_state.suggestions:
-                        suggestion_id = suggestion.get('id')
-                        checkbox_key = f"cb_{suggestion_id}"
-                        if st.session_state.get(checkbox_key, True):
-                            page_num = suggestion.get('page_num', 0)
-                            for rect in suggestion.get('rects', []):
-                                all_redactions[page_num].append({
-                                    "x": rect.x0, "y": rect.y0, 
-                                    "w": rect.x1 - rect.x0, "h": rect.y1 - rect.y0
-                                })
+                    for page_num, page_suggestions in st.session_state.suggestions_by_page.items():
+                        page_rects = [
+                            {"x": rect.x0, "y": rect.y0, "w": rect.x1 - rect.x0, "h": rect.y1 - rect.y0}
+                            for suggestion in page_suggestions if suggestion.id in approved_ids
+                            for rect in suggestion.rects
+                        ]
+                        if page_rects:
+                            all_redactions[page_num] = page_rects
                     
                     # Add manual rectangles
                     for p_idx, objs in st.session_state.manual_rects.items():
                         if not objs:
                             continue
             
-                        orig_w, orig_h = st.session_state.original_pdf_images[p_idx].size
-                        display_w = CANVAS_DISPLAY_WIDTH
-                        display_h = int(orig_h * CANVAS_DISPLAY_WIDTH / orig_w)
-                        sx = orig_w / float(display_w)
-                        sy = orig_h / float(display_h)
-        
-                        dpi_scale = 72.0 / PREVIEW_DPI
+                        # Recorded when the page's canvas was drawn, which any page with
+                        # manual boxes has been
+                        sx, sy = st.session_state.canvas_scales[p_idx]
 
-                        for o in objs:
-                            if o.get("type") != "rect":
-                                continue
-                            left = o.get("left", 0) * sx * dpi_scale
-                            top = o.get("top", 0) * sy * dpi_scale
-                            width = o.get("width", 0) * sx * dpi_scale
-                            height = o.get("height", 0) * sy * dpi_scale
-                            all_redactions[p_idx].append({"x": left, "y": top, "w": width, "h": height})
+                        boxes = np.array(
+                            [[o.get("left", 0), o.get("top", 0), o.get("width", 0), o.get("height", 0)]
+                             for o in objs if o.get("type") == "rect"],
+                            dtype=float
+                        ).reshape(-1, 4)
+                        boxes *= (sx, sy, sx, sy)
+                        all_redactions[p_idx].extend(
+                            {"x": left, "y": top, "w": width, "h": height}
+                            for left, top, width, height in boxes.tolist()
+                        )
 
                     if not any(all_redactions.values()):
                         st.error("❌ No redactions to apply.")
                     else:
-                        processor = PDFProcessor()
                         input_path = st.session_state.processed_file
                         timestamp = int(time.time())
                         output_filename = f"redacted_{timestamp}_{os.path.basename(input_path)}"
                         output_path = os.path.join(paths["output_dir"], output_filename)
                         
                         try:
-                            processor.apply_rect_redactions(input_path, dict(all_redactions), output_path)
+                            PDFProcessor.apply_rect_redactions(input_path, dict(all_redactions), output_path)
                             st.session_state.final_pdf_path = output_path
                             
+                            # Bytes served by the download button below
                             with open(output_path, "rb") as file:
-                                st.download_button(
-                                    "📥 Download Redacted PDF", 
-                                    data=file.read(),
-                                    file_name=output_filename, 
-                                    mime="application/pdf",
-                                    use_container_width=True
-                                )
+                                st.session_state.final_pdf_bytes = file.read()
                             
                             st.success(f"🎉 Redaction complete! File saved as `{output_filename}`")
                             
                         except Exception as e:
                             st.error(f"❌ Error: {str(e)}")
+
+            if st.session_state.final_pdf_bytes:
+                st.download_button(
+                    "📥 Download Redacted PDF", 
+                    data=st.session_state.final_pdf_bytes,
+                    file_name=os.path.basename(st.session_state.final_pdf_path), 
+                    mime="application/pdf",
+                    use_container_width=True
+                )
     else:
         # Welcome screen
         st.markdown("""
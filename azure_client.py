@@ -1,6 +1,8 @@
 import os
 import json
 import re
+import hashlib
+import threading
 from typing import List, Dict, Tuple, Optional, Union
 from enum import Enum
 
@@ -11,6 +13,36 @@ from azure.ai.textanalytics import TextAnalyticsClient, PiiEntityCategory
 from openai import AzureOpenAI
 
 
+# Sensitive-content pages are sent several at a time, so 429s are expected under load;
+# the SDK retries those (and timeouts) with exponential backoff that honours retry-after.
+# Its default of 2 gives up too early once a long document is fanned out
+OPENAI_MAX_RETRIES = 5
+
+# Successful sensitive-content replies kept per (page text, rule). Changing only the
+# exceptions in the instructions re-runs the analysis with the same rule, so those pages hit
+SENSITIVE_CONTENT_CACHE_SIZE = 256
+
+# The sensitive-content prompt is sent once per page; only the user's rule varies,
+# so the template is built once here and filled in with str.format per call
+SENSITIVE_CONTENT_SYSTEM_PROMPT = """
+        You are a highly advanced document analysis tool. Your task is to analyze a specific block of text based on a user's rule, using the surrounding text for context only.
+
+        **USER'S SENSITIVE CONTENT RULE:** "{user_context}"
+
+        --- YOUR THOUGHT PROCESS ---
+        1. First, I will read the full text to understand the full context.
+        2. Second, I will ONLY extract passages, sentences, or quotations from the "TARGET TEXT" that strictly match the user's rule. I will not extract anything from the context block.
+        
+        For each match, use the category `SensitiveContent`. Only extract text whose connection to the user's rule you could state explicitly.
+
+        CRITICAL: Only extract text that directly matches the user's rule. Do not extract anything else.
+
+        **Output Format:**
+        Respond ONLY with a valid JSON object with a single key "redactions", which is an array of objects.
+        Each object must have "text" and "category". If nothing is found, return an empty "redactions" array.
+        """
+
+
 class TaskComplexity(Enum):
     """Enum to define task complexity levels for model selection"""
     SIMPLE = "simple"
@@ -38,12 +70,17 @@ class AzureAIClient:
         self.openai_client = AzureOpenAI(
             api_key=openai_key,
             api_version="2024-02-01",
-            azure_endpoint=openai_endpoint
+            azure_endpoint=openai_endpoint,
+            max_retries=OPENAI_MAX_RETRIES
         )
         self.text_analytics_client = TextAnalyticsClient(
             endpoint=lang_endpoint, credential=AzureKeyCredential(lang_key)
         )
 
+        self._sensitive_content_cache: Dict[bytes, List[Dict]] = {}
+        # Pages are analysed on several threads at once
+        self._sensitive_content_cache_lock = threading.Lock()
+
         # Define complex tasks that require the advanced model
         self.complex_tasks = {
             "instruction_parsing",
@@ -132,7 +169,7 @@ class AzureAIClient:
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             print(f"Error parsing user instructions: {e}")
-            return {} # Return empty on failure
+            raise RuntimeError(f"Failed to parse redaction instructions: {e}") from e
 
     def get_pii(self, text_chunk: str) -> list:
         """Extracts structured PII entities using Azure Language Studio."""
@@ -164,7 +201,7 @@ class AzureAIClient:
             return entities
         except Exception as e:
             print(f"Error getting PII from Language Service: {e}")
-            return []
+            raise RuntimeError(f"Failed to detect PII: {e}") from e
 
     def is_school(self, organization_name: str, context_sentence: str, fallback_to_conservative: bool = True) -> bool:
         """
@@ -497,30 +534,19 @@ class AzureAIClient:
             return json.loads(response.choices[0].message.content)
         except Exception as e:
             print(f"Error performing entity linking: {e}")
-            return {}
+            raise RuntimeError(f"Failed to link entities to people: {e}") from e
 
     def get_sensitive_information(self, text_chunk: str, user_context: str) -> List[Dict]:
         """
         Uses an LLM for nuanced, context-aware redaction based on specific user rules.
         """
 
-        system_prompt = f"""
-        You are a highly advanced document analysis tool. Your task is to analyze a specific block of text based on a user's rule, using the surrounding text for context only.
+        cache_key = hashlib.blake2b(f"{user_context}\0{text_chunk}".encode("utf-8"), digest_size=16).digest()
+        cached = self._sensitive_content_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
 
-        **USER'S SENSITIVE CONTENT RULE:** "{user_context}"
-
-        --- YOUR THOUGHT PROCESS ---
-        1. First, I will read the full text to understand the full context.
-        2. Second, I will ONLY extract passages, sentences, or quotations from the "TARGET TEXT" that strictly match the user's rule. I will not extract anything from the context block.
-        
-        For each match, use the category `SensitiveContent`. In your reasoning, you MUST explain how the extracted text specifically relates to the user's rule.
-
-        CRITICAL: Only extract text that directly matches the user's rule. Do not extract anything else.
-
-        **Output Format:**
-        Respond ONLY with a valid JSON object with a single key "redactions", which is an array of objects.
-        Each object must have "text", "category", and "reasoning". If nothing is found, return an empty "redactions" array.
-        """
+        system_prompt = SENSITIVE_CONTENT_SYSTEM_PROMPT.format(user_context=user_context)
         
         try:
             model = self.get_appropriate_model(TaskComplexity.COMPLEX)
@@ -534,10 +560,14 @@ class AzureAIClient:
                 temperature=0.0
             )
             response_content = response.choices[0].message.content
-            if response_content:
-                data = json.loads(response_content)
-                return data.get("redactions", [])
-            return []
+            redactions = json.loads(response_content).get("redactions", []) if response_content else []
         except Exception as e:
             print(f"An error occurred while calling Azure OpenAI: {e}")
-            return []
\ No newline at end of file
+            raise RuntimeError(f"Failed to analyse page for sensitive content: {e}") from e
+
+        with self._sensitive_content_cache_lock:
+            if len(self._sensitive_content_cache) >= SENSITIVE_CONTENT_CACHE_SIZE:
+                # Dicts keep insertion order, so this drops the oldest entry
+                self._sensitive_content_cache.pop(next(iter(self._sensitive_content_cache)), None)
+            self._sensitive_content_cache[cache_key] = redactions
+        return list(redactions)
\ No newline at end of file
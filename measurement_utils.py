@@ -5,6 +5,7 @@ Measurement utilities for converting between canvas coordinates and PDF coordina
 from typing import Tuple, List, Dict
 from PIL import Image, ImageDraw, ImageFont
 import math
+import numpy as np
 
 
 def canvas_to_pdf_coords(
@@ -93,6 +94,31 @@ def pdf_to_canvas_coords(
     return (canvas_x, canvas_y)
 
 
+def pdf_to_canvas_coords_batch(
+    points: List[Tuple[float, float]],
+    canvas_width: int,
+    canvas_height: int,
+    pdf_width: float,
+    pdf_height: float
+) -> np.ndarray:
+    """
+    Convert many PDF points to canvas coordinates in one array operation
+    
+    Same transform as pdf_to_canvas_coords: its preview DPI terms cancel out,
+    leaving a single per-axis scale that is applied to all points at once.
+    
+    Args:
+        points: Points in PDF space (points), as (x, y) pairs
+        canvas_width, canvas_height: Dimensions of the canvas
+        pdf_width, pdf_height: Original PDF page dimensions in points
+        
+    Returns:
+        (N, 2) array of canvas coordinates
+    """
+    scale = np.array([canvas_width / pdf_width, canvas_height / pdf_height])
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2) * scale
+
+
 def draw_measurement_on_image(
     image: Image.Image,
     measurement_type: str,
@@ -18,6 +18,10 @@ class PDFProcessor:
         Applies redactions to the PDF document and saves the output.
         Legacy method for backward compatibility.
 
+        All rects for a page are added as annotations first and then burned in
+        with a single page.apply_redactions() call, so callers should group
+        rects by page rather than calling once per rect.
+
         Args:
             redaction_areas: A list of tuples, where each tuple contains a page number
                              and a list of fitz.Rect objects for that page.
@@ -68,6 +72,9 @@ class PDFProcessor:
         Enhanced static method for applying redactions from dictionary format.
         Used by the enhanced UI.
 
+        Each page's rects are added as annotations and then applied in one
+        page.apply_redactions() pass, so pass every rect for a page in one list.
+
         Args:
             input_path: Path to the input PDF file
             redaction_dict: Dictionary mapping page numbers to lists of redaction rectangles
@@ -104,14 +111,18 @@ class PDFProcessor:
                 continue
 
             page = doc[page_num]
+            page_rect = page.rect
             processed_pages += 1
             
             print(f"\n📄 Processing Page {page_num + 1}")
-            print(f"   📐 Page size: {page.rect.width:.1f} × {page.rect.height:.1f} pts")
+            print(f"   📐 Page size: {page_rect.width:.1f} × {page_rect.height:.1f} pts")
             print(f"   🎯 Redactions: {len(redaction_rects)}")
             
             # Convert dictionary rectangles to fitz.Rect objects and apply
             applied_count = 0
+            # The same text found twice (or a manual box over an AI one) yields identical
+            # rects; compare at 0.1pt so each area is annotated only once
+            seen_rects = set()
             for i, rect_dict in enumerate(redaction_rects):
                 try:
                     x = rect_dict.get('x', 0)
@@ -128,9 +139,15 @@ class PDFProcessor:
                         continue
                         
                     # Clip to page bounds to prevent errors
-                    rect = rect & page.rect
+                    rect = rect & page_rect
                     
+                    rect_key = (round(rect.x0, 1), round(rect.y0, 1), round(rect.x1, 1), round(rect.y1, 1))
+                    if rect_key in seen_rects:
+                        print(f"   ↩️ Skipping duplicate rectangle {i+1}")
+                        continue
+
                     if not rect.is_empty:
+                        seen_rects.add(rect_key)
                         page.add_redact_annot(rect, fill=(0, 0, 0))
                         applied_count += 1
                         print(f"   ✅ Redaction {i+1}: ({x:.1f}, {y:.1f}) {w:.1f}×{h:.1f}")
@@ -140,7 +157,11 @@ class PDFProcessor:
                 except Exception as e:
                     print(f"   ❌ Error processing rectangle {i+1}: {e}")
             
-            # Apply all redactions for this page
+            if not applied_count:
+                print(f"   ⚠️ No valid redactions for page {page_num + 1}")
+                continue
+
+            # Apply all redactions for this page in a single pass
             try:
                 page.apply_redactions(images=2)
                 print(f"   ✅ Applied {applied_count}/{len(redaction_rects)} redactions to page {page_num + 1}")
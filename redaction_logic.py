@@ -1,10 +1,16 @@
 import os
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple
 from dotenv import load_dotenv
 from azure_client import AzureAIClient
 from utils import create_detailed_suggestions
 from azure.ai.documentintelligence.models import DocumentParagraph
 
+# Per-page sensitive-content calls are independent network round-trips, so they run on a
+# small thread pool; the cap keeps a long document from bursting past the deployment's rate limit
+SENSITIVE_CONTENT_MAX_WORKERS = 8
+
 def merge_small_paragraphs(paragraphs: list[DocumentParagraph], min_length: int = 50) -> list[DocumentParagraph]:
     """
     Merges small paragraphs into the previous paragraph to create more
@@ -34,6 +40,17 @@ def merge_small_paragraphs(paragraphs: list[DocumentParagraph], min_length: int
     return merged_paragraphs
 
 
+@functools.lru_cache(maxsize=1)
+def get_azure_client() -> AzureAIClient:
+    """
+    Returns the process-wide AzureAIClient, built on first use. The SDK clients
+    it wraps keep their HTTP connection pools, so later analyses reuse them
+    instead of re-reading credentials and opening new TLS connections.
+    """
+    load_dotenv()
+    return AzureAIClient()
+
+
 def analyse_document_for_redactions(input_pdf_path: str, user_context: str):
     """
     Orchestrates the hybrid AI analysis with conditional entity linking and contextual DOB filtering.
@@ -41,19 +58,24 @@ def analyse_document_for_redactions(input_pdf_path: str, user_context: str):
     - Paragraph-by-paragraph for structured PII.
     - Page-by-page for subjective, context-aware content.
     """
-    load_dotenv()
-    azure_client = AzureAIClient()
+    azure_client = get_azure_client()
     
-    # Parse user instructions 
-    print("Step 1: Parsing user instructions...")
-    parsed_instructions = azure_client.parse_user_instructions(user_context)
+    # Parsing the instructions and the layout analysis don't depend on each other, so the
+    # LLM call runs on a worker thread while this one waits on Document Intelligence
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Parse user instructions 
+        print("Step 1: Parsing user instructions...")
+        instructions_future = executor.submit(azure_client.parse_user_instructions, user_context)
+
+        # Analyse and merge 
+        print("Step 2: Analysing document layout...")
+        analysis_result = azure_client.analyse_document(input_pdf_path)
+        parsed_instructions = instructions_future.result()
+
     pii_exceptions = [exc.lower() for exc in parsed_instructions.get("exceptions", [])]
     sensitive_content_rules = parsed_instructions.get("sensitive_content_rules")
     print(f"Found {len(pii_exceptions)} PII exceptions and a sensitive content rule: {'Yes' if sensitive_content_rules else 'No'}")
 
-    # Analyse and merge 
-    print("Step 2: Analysing document layout...")
-    analysis_result = azure_client.analyse_document(input_pdf_path)
     if not analysis_result.paragraphs: return []
     print("Step 3: Merging small paragraphs...")
     paragraphs = merge_small_paragraphs(analysis_result.paragraphs)
@@ -190,15 +212,26 @@ def analyse_document_for_redactions(input_pdf_path: str, user_context: str):
     # Nuanced LLM analysis for sensitive content (unchanged - this requires complex reasoning)
     if sensitive_content_rules:
         print("\nTask B: Processing sensitive content page-by-page...")
-        for page in analysis_result.pages:
-            page_content = analysis_result.content[page.spans[0].offset : page.spans[0].offset + page.spans[0].length]
-            print(f"  - Analyzing Page {page.page_number} for sensitive content...")
 
-            sensitive_findings = azure_client.get_sensitive_information(
+        def find_sensitive_content(page):
+            page_content = analysis_result.content[page.spans[0].offset : page.spans[0].offset + page.spans[0].length] if page.spans else ""
+            if not page_content.strip():
+                # Blank and image-only pages have nothing for the model to extract
+                print(f"  - Skipping Page {page.page_number}: no text")
+                return []
+            print(f"  - Analyzing Page {page.page_number} for sensitive content...")
+            return azure_client.get_sensitive_information(
                 text_chunk=page_content,
                 user_context=sensitive_content_rules
             )
 
+        pages = analysis_result.pages
+        workers = min(SENSITIVE_CONTENT_MAX_WORKERS, len(pages)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map() yields in page order, so findings are collected exactly as before
+            page_findings = list(executor.map(find_sensitive_content, pages))
+
+        for page, sensitive_findings in zip(pages, page_findings):
             for finding in sensitive_findings:
                 if finding['text'].lower() not in pii_exceptions:
                     all_findings_with_source.append({
@@ -1,12 +1,12 @@
 import logging
-from typing import List, Dict
+from dataclasses import dataclass
+from typing import List, Dict, Optional
 from collections import defaultdict, Counter
 from azure.ai.documentintelligence.models import AnalyzeResult, DocumentParagraph
 from rapidfuzz import fuzz  # ✅ Changed from fuzzywuzzy to rapidfuzz
 import fitz
 import os
 from PIL import Image
-from io import BytesIO
 
 # --- Logger Setup ---
 def get_logger():
@@ -155,6 +155,7 @@ def create_detailed_suggestions(
             
             words_to_search = []
             context = ""
+            context_offset = 0
             
             if source_paragraph:
                 para_span = source_paragraph.spans[0]
@@ -163,19 +164,23 @@ def create_detailed_suggestions(
                     if w_dict['word_obj'].span.offset >= para_span.offset and
                        (w_dict['word_obj'].span.offset + w_dict['word_obj'].span.length) <= (para_span.offset + para_span.length)
                 ]
-                context = source_paragraph.content
+                context_offset = para_span.offset
+                # Sliced from analysis.content, which the match offsets index; a merged
+                # paragraph's .content isn't the same text
+                context = analysis.content[context_offset : context_offset + para_span.length]
             elif source_page:
                 words_to_search = words_by_page.get(page_num, [])
-                context = analysis.content[source_page.spans[0].offset : source_page.spans[0].offset + source_page.spans[0].length]
+                context_offset = source_page.spans[0].offset
+                context = analysis.content[context_offset : context_offset + source_page.spans[0].length]
             
             texts_to_find.append(text_to_find)
-            finding_contexts.append((item, context, words_to_search))
+            finding_contexts.append((item, context, context_offset, words_to_search))
             
         # Batch process fuzzy matching for this page
         if texts_to_find and finding_contexts:
             # For now, process individually but with optimized matching
             # Future: Could implement true batch processing if RapidFuzz supports it
-            for (item, context, words_to_search), text_to_find in zip(finding_contexts, texts_to_find):
+            for (item, context, context_offset, words_to_search), text_to_find in zip(finding_contexts, texts_to_find):
                 llm_finding = item['llm_finding']
                 
                 # Use optimized batch function (even for single item)
@@ -201,9 +206,14 @@ def create_detailed_suggestions(
                     
                     if individual_word_rects:
                         merged_line_rects = merge_consecutive_word_rects(individual_word_rects)
+                        # The matched words' spans locate the text in its context, so the UI can
+                        # slice around it instead of searching the context on every render
+                        first_span, last_span = best_match_words[0].span, best_match_words[-1].span
                         detailed_suggestions.append({
                             'id': suggestion_id_counter, 'text': llm_finding['text'], 'category': llm_finding['category'],
-                            'reasoning': llm_finding['reasoning'], 'context': context,
+                            'reasoning': llm_finding.get('reasoning', ''), 'context': context,
+                            'match_start': first_span.offset - context_offset,
+                            'match_end': last_span.offset + last_span.length - context_offset,
                             'page_num': page_num, 'rects': merged_line_rects
                         })
                         suggestion_id_counter += 1
@@ -232,16 +242,60 @@ def create_detailed_suggestions(
             
     return detailed_suggestions
 
+@dataclass(slots=True)
+class Suggestion:
+    """A detailed suggestion as the UI reads it, with the dict's defaults filled in once"""
+    id: int
+    text: str
+    category: str
+    page_num: int
+    rects: List[fitz.Rect]
+    reasoning: str = ""
+    context: Optional[str] = None
+    match_start: Optional[int] = None
+    match_end: Optional[int] = None
+    # UI-side values, filled in by the app when it indexes the suggestions
+    cb_key: str = ""
+    snippet: str = ""
+    preview_rects: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Suggestion':
+        return cls(
+            id=data.get('id'),
+            text=data.get('text', 'No text'),
+            category=data.get('category', 'Unknown'),
+            page_num=data.get('page_num', 0),
+            rects=data.get('rects', []),
+            reasoning=data.get('reasoning', ''),
+            context=data.get('context'),
+            match_start=data.get('match_start'),
+            match_end=data.get('match_end')
+        )
+
 # --- PDF to Image Conversion for Preview ---
-PREVIEW_DPI = 150
-def get_original_pdf_images(pdf_path):
-    """Extracts each page of a PDF as a Pillow Image object."""
-    if not os.path.exists(pdf_path): return []
+# Nominal preview resolution passed to the measurement canvas-to-PDF conversion;
+# previews themselves are rendered at the canvas width, not at this DPI
+PREVIEW_DPI = 96
+
+def render_pdf_page(pdf_path: str, page_index: int, width: int):
+    """Renders a single PDF page as a Pillow Image rasterised straight at ``width`` pixels.
+
+    MuPDF does the scaling, so no resample pass is needed afterwards. Raises if the page can't be
+    rendered, so a failure is never cached as an image.
+    """
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF not found: {pdf_path}")
     try:
         doc = fitz.open(pdf_path)
-        images = [Image.open(BytesIO(page.get_pixmap(dpi=PREVIEW_DPI).tobytes("png"))) for page in doc]
-        doc.close()
-        return images
+        try:
+            page = doc[page_index]
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            # samples_mv reads MuPDF's buffer in place; .samples would first copy it to bytes
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples_mv)
+        finally:
+            doc.close()
     except Exception as e:
-        logger.error(f"Error opening or rendering PDF: {e}")
-        return []
\ No newline at end of file
+        logger.error(f"Error rendering page {page_index} of PDF: {e}")
+        raise